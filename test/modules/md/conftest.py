@@ -11,6 +11,21 @@ from .md_env import MDTestEnv
 from .md_acme import MDPebbleRunner, MDBoulderRunner
 
 
+def pytest_configure(config):
+    # all tests share one httpd, one ACME server and the ports from
+    # config.ini, each xdist worker would wipe the others' gen dir
+    if getattr(config.option, 'numprocesses', None):
+        raise pytest.UsageError("mod_md tests cannot run in parallel (-n/--numprocesses)")
+
+
+@pytest.hookimpl(tryfirst=True, hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    # make the outcome of a test available to its fixtures' teardown
+    outcome = yield
+    rep = outcome.get_result()
+    setattr(item, f"rep_{rep.when}", rep)
+
+
 def pytest_report_header(config, startdir):
     env = MDTestEnv()
     return "mod_md: [apache: {aversion}({prefix}), mod_{ssl}, ACME server: {acme}]".format(
@@ -21,7 +36,7 @@ def pytest_report_header(config, startdir):
     )
 
 
-@pytest.fixture(scope="package")
+@pytest.fixture(scope="session")
 def env(pytestconfig) -> MDTestEnv:
     level = logging.INFO
     console = logging.StreamHandler()
@@ -36,7 +51,7 @@ def env(pytestconfig) -> MDTestEnv:
     return env
 
 
-@pytest.fixture(autouse=True, scope="package")
+@pytest.fixture(autouse=True, scope="session")
 def _session_scope(env):
     # we'd like to check the httpd error logs after the test suite has
     # run to catch anything unusual. For this, we setup the ignore list
@@ -75,7 +90,7 @@ def _session_scope(env):
             "{0}\n{1}\n".format("\n".join(errors), "\n".join(warnings))
 
 
-@pytest.fixture(scope="package")
+@pytest.fixture(scope="session")
 def acme(env):
     acme_server = None
     if env.acme_server == 'pebble':
@@ -33,7 +33,8 @@ class MDCertUtil(object):
         pkey_file = os.path.join(path, 'privkey.pem')
         # create a key pair
         if os.path.exists(pkey_file):
-            key_buffer = open(pkey_file, 'rt').read()
+            with open(pkey_file, 'rt') as fd:
+                key_buffer = fd.read()
             k = OpenSSL.crypto.load_privatekey(OpenSSL.crypto.FILETYPE_PEM, key_buffer)
         else:
             k = OpenSSL.crypto.PKey()
@@ -57,10 +58,10 @@ class MDCertUtil(object):
         cert.set_pubkey(k)
         cert.sign(k, 'sha1')
 
-        open(cert_file, "wt").write(
-            OpenSSL.crypto.dump_certificate(OpenSSL.crypto.FILETYPE_PEM, cert).decode('utf-8'))
-        open(pkey_file, "wt").write(
-            OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, k).decode('utf-8'))
+        with open(cert_file, "wt") as fd:
+            fd.write(OpenSSL.crypto.dump_certificate(OpenSSL.crypto.FILETYPE_PEM, cert).decode('utf-8'))
+        with open(pkey_file, "wt") as fd:
+            fd.write(OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, k).decode('utf-8'))
 
     @classmethod
     def load_server_cert(cls, host_ip, host_port, host_name, tls=None, ciphers=None):
@@ -77,11 +78,14 @@ class MDCertUtil(object):
             ctx.set_cipher_list(ciphers)
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         connection = OpenSSL.SSL.Connection(ctx, s)
-        connection.connect((host_ip, int(host_port)))
-        connection.setblocking(1)
-        connection.set_tlsext_host_name(host_name.encode('utf-8'))
-        connection.do_handshake()
-        peer_cert = connection.get_peer_certificate()
+        try:
+            connection.connect((host_ip, int(host_port)))
+            connection.setblocking(1)
+            connection.set_tlsext_host_name(host_name.encode('utf-8'))
+            connection.do_handshake()
+            peer_cert = connection.get_peer_certificate()
+        finally:
+            connection.close()
         return MDCertUtil(None, cert=peer_cert)
 
     @classmethod
@@ -1,6 +1,5 @@
-import copy
+import http.client
 import inspect
-import json
 import logging
 from configparser import ConfigParser, ExtendedInterpolation
 
@@ -8,20 +7,39 @@ import pytest
 import re
 import os
 import shutil
+import signal
+import socket
+import ssl
 import subprocess
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+from threading import Thread
 from typing import Dict, Optional
 
 from pyhttpd.certs import CertificateSpec
 from .md_cert_util import MDCertUtil
 from pyhttpd.env import HttpdTestSetup, HttpdTestEnv
-from pyhttpd.result import ExecResult
+from pyhttpd.result import ExecResult, json_loads
 
 log = logging.getLogger(__name__)
 
 
+class _ResolvedHTTPSConnection(http.client.HTTPSConnection):
+    """HTTPS to a host name at a fixed address, as curl's --resolve does."""
+
+    def __init__(self, host, port, addr, context, timeout):
+        super().__init__(host, port, timeout=timeout, context=context)
+        self._addr = addr
+
+    def connect(self):
+        sock = socket.create_connection((self._addr, self.port), self.timeout,
+                                        self.source_address)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
 class MDTestSetup(HttpdTestSetup):
 
     def __init__(self, env: 'MDTestEnv'):
@@ -41,13 +59,13 @@ class MDTestSetup(HttpdTestSetup):
         conf_dest_dir = os.path.join(self.env.gen_dir, 'pebble')
         if not os.path.exists(conf_dest_dir):
             os.makedirs(conf_dest_dir)
-        for name in os.listdir(conf_src_dir):
-            src_path = os.path.join(conf_src_dir, name)
-            m = re.match(r'(.+).template', name)
-            if m:
-                self._make_template(src_path, os.path.join(conf_dest_dir, m.group(1)))
-            elif os.path.isfile(src_path):
-                shutil.copy(src_path, os.path.join(conf_dest_dir, name))
+        with os.scandir(conf_src_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.template'):
+                    self._make_template(entry.path, os.path.join(
+                        conf_dest_dir, entry.name[:-len('.template')]))
+                elif entry.is_file():
+                    shutil.copy(entry.path, os.path.join(conf_dest_dir, entry.name))
 
 
 class MDTestEnv(HttpdTestEnv):
@@ -63,6 +81,20 @@ class MDTestEnv(HttpdTestEnv):
     DOMAIN_SUFFIX = "%d.org" % time.time()
     LOG_FMT_TIGHT = '%(levelname)s: %(message)s'
 
+    # openssl s_client protocol options as MDCertUtil versions
+    TLS_PROTO_VERSIONS = {
+        'tls1': 1.0,
+        'tls1_1': 1.1,
+        'tls1_2': 1.2,
+        'tls1_3': 1.3,
+    }
+
+    RE_RSA_PKEY_SPEC = re.compile(r'^rsa( ?\d+)?$')
+    RE_S_CLIENT_STATUS = re.compile(r'OCSP response: +(?P<response>[^=\n]+)\n'
+                                    r'|OCSP Response Status:\s*(?P<status>.+)'
+                                    r'|Verify return code:\s*(?P<verify>.+)')
+    RE_CONFIG_GENERATION = re.compile(r'^ParentServerConfigGeneration: *(\d+)', re.MULTILINE)
+
     @classmethod
     def get_acme_server(cls):
         return os.environ['ACME'] if 'ACME' in os.environ else "pebble"
@@ -84,7 +116,9 @@ class MDTestEnv(HttpdTestEnv):
         return cls.is_pebble()
 
     @classmethod
+    @lru_cache(maxsize=1)
     def has_a2md(cls):
+        # evaluated by the skipif of many test modules, read config.ini once
         d = os.path.dirname(inspect.getfile(HttpdTestEnv))
         config = ConfigParser(interpolation=ExtendedInterpolation())
         config.read(os.path.join(d, 'config.ini'))
@@ -113,6 +147,8 @@ class MDTestEnv(HttpdTestEnv):
         self._default_domain = f"test1.{self.http_tld}"
         self._tailscale_domain = "test.headless-chicken.ts.net"
         self._store_dir = "./md"
+        self._json_files = {}
+        self._status_conns = {}
         self.set_store_dir_default()
 
         self.add_cert_specs([
@@ -140,12 +176,6 @@ class MDTestEnv(HttpdTestEnv):
             self.a2md_rawargs([self.a2md_bin, "-a", self.acme_url,
                                "-d", self._store_dir,  "-C", self.acme_ca_pemfile])
 
-    def get_apxs_var(self, name: str) -> str:
-        p = subprocess.run([self._apxs, "-q", name], capture_output=True, text=True)
-        if p.returncode != 0:
-            return ""
-        return p.stdout.strip()
-
     @property
     def acme_server(self):
         return self._acme_server
@@ -176,16 +206,16 @@ class MDTestEnv(HttpdTestEnv):
 
     def get_request_domain(self, request):
         name = request.node.originalname if request.node.originalname else request.node.name
-        return "%s-%s" % (re.sub(r'[_]', '-', name), MDTestEnv.DOMAIN_SUFFIX)
+        return "%s-%s" % (name.replace('_', '-'), MDTestEnv.DOMAIN_SUFFIX)
 
     def get_method_domain(self, method):
-        return "%s-%s" % (re.sub(r'[_]', '-', method.__name__.lower()), MDTestEnv.DOMAIN_SUFFIX)
+        return "%s-%s" % (method.__name__.lower().replace('_', '-'), MDTestEnv.DOMAIN_SUFFIX)
 
     def get_module_domain(self, module):
-        return "%s-%s" % (re.sub(r'[_]', '-', module.__name__.lower()), MDTestEnv.DOMAIN_SUFFIX)
+        return "%s-%s" % (module.__name__.lower().replace('_', '-'), MDTestEnv.DOMAIN_SUFFIX)
 
     def get_class_domain(self, c):
-        return "%s-%s" % (re.sub(r'[_]', '-', c.__name__.lower()), MDTestEnv.DOMAIN_SUFFIX)
+        return "%s-%s" % (c.__name__.lower().replace('_', '-'), MDTestEnv.DOMAIN_SUFFIX)
 
     # --------- cmd execution ---------
 
@@ -227,11 +257,31 @@ class MDTestEnv(HttpdTestEnv):
 
     # --------- access local store ---------
 
+    @staticmethod
+    def _rmtrees(paths):
+        # a single 'rm' walks all trees natively, much faster than
+        # shutil.rmtree on stores with many small files
+        if shutil.which("rm"):
+            subprocess.run(["rm", "-rf", "--"] + paths)
+        else:
+            for path in paths:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _trash(self, paths):
+        # move the paths out of the store (a rename is instant) and
+        # remove them in the background while the test goes on
+        trash_dir = f"{self._store_dir}.trash.{os.getpid()}.{time.time_ns()}"
+        os.makedirs(trash_dir)
+        for path in paths:
+            if os.path.exists(path):
+                os.rename(path, os.path.join(trash_dir, os.path.basename(path)))
+        Thread(target=self._rmtrees, args=([trash_dir],), daemon=True).start()
+
     def purge_store(self):
         log.debug("purge store dir: %s" % self._store_dir)
         assert len(self._store_dir) > 1
         if os.path.exists(self._store_dir):
-            shutil.rmtree(self._store_dir, ignore_errors=False)
+            self._trash([self._store_dir])
         os.makedirs(self._store_dir)
 
     def clear_store(self):
@@ -239,8 +289,9 @@ class MDTestEnv(HttpdTestEnv):
         assert len(self._store_dir) > 1
         if not os.path.exists(self._store_dir):
             os.makedirs(self._store_dir)
-        for dirpath in ["challenges", "tmp", "archive", "domains", "accounts", "staging", "ocsp"]:
-            shutil.rmtree(os.path.join(self._store_dir, dirpath), ignore_errors=True)
+        self._trash([os.path.join(self._store_dir, dirpath) for dirpath in [
+            "challenges", "tmp", "archive", "domains", "accounts", "staging", "ocsp"
+        ]])
 
     def clear_ocsp_store(self):
         assert len(self._store_dir) > 1
@@ -252,7 +303,8 @@ class MDTestEnv(HttpdTestEnv):
     def authz_save(self, name, content):
         dirpath = os.path.join(self._store_dir, 'staging', name)
         os.makedirs(dirpath)
-        open(os.path.join(dirpath, 'authz.json'), "w").write(content)
+        with open(os.path.join(dirpath, 'authz.json'), "w") as fd:
+            fd.write(content)
 
     def path_store_json(self):
         return os.path.join(self._store_dir, 'md_store.json')
@@ -295,7 +347,21 @@ class MDTestEnv(HttpdTestEnv):
         shutil.copytree(src, self._store_dir)
 
     def list_accounts(self):
-        return os.listdir(os.path.join(self._store_dir, 'accounts'))
+        with os.scandir(os.path.join(self._store_dir, 'accounts')) as it:
+            return [entry.name for entry in it if entry.is_dir()]
+
+    def load_json_file(self, path) -> Dict:
+        """Load a JSON file from the store, re-using the last parsed data
+           if the file has not changed since. Do not modify the result."""
+        st = os.stat(path)
+        # the store replaces files by renaming, so a changed inode tells us, too
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._json_files.get(path)
+        if cached is None or cached[0] != key:
+            with open(path, 'rb') as f:
+                cached = (key, json_loads(f.read()))
+            self._json_files[path] = cached
+        return cached[1]
 
     def check_md(self, domain, md=None, state=-1, ca=None, protocol=None, agreement=None, contacts=None):
         domains = None
@@ -304,9 +370,7 @@ class MDTestEnv(HttpdTestEnv):
             domain = domains[0]
         if md:
             domain = md
-        path = self.store_domain_file(domain, 'md.json')
-        with open(path) as f:
-            md = json.load(f)
+        md = self.load_json_file(self.store_domain_file(domain, 'md.json'))
         assert md
         if domains:
             assert md['domains'] == domains
@@ -323,12 +387,12 @@ class MDTestEnv(HttpdTestEnv):
             assert md['contacts'] == contacts
 
     def pkey_fname(self, pkeyspec=None):
-        if pkeyspec and not re.match(r'^rsa( ?\d+)?$', pkeyspec.lower()):
+        if pkeyspec and not self.RE_RSA_PKEY_SPEC.match(pkeyspec.lower()):
             return "privkey.{0}.pem".format(pkeyspec.lower())
         return 'privkey.pem'
 
     def cert_fname(self, pkeyspec=None):
-        if pkeyspec and not re.match(r'^rsa( ?\d+)?$', pkeyspec.lower()):
+        if pkeyspec and not self.RE_RSA_PKEY_SPEC.match(pkeyspec.lower()):
             return "pubcert.{0}.pem".format(pkeyspec.lower())
         return 'pubcert.pem'
 
@@ -358,11 +422,9 @@ class MDTestEnv(HttpdTestEnv):
         cert.validate_cert_matches_priv_key(self.store_domain_file(domain, 'privkey.pem'))
         # check SANs and CN
         assert cert.get_cn() == domain
-        # compare lists twice in opposite directions: SAN may not respect ordering
+        # SAN may not respect ordering
         san_list = list(cert.get_san_list())
-        assert len(san_list) == len(domains)
-        assert set(san_list).issubset(domains)
-        assert set(domains).issubset(san_list)
+        assert sorted(san_list) == sorted(domains)
         # check valid dates interval
         not_before = cert.get_not_before()
         not_after = cert.get_not_after()
@@ -372,11 +434,10 @@ class MDTestEnv(HttpdTestEnv):
     # --------- check utilities ---------
 
     def check_json_contains(self, actual, expected):
-        # write all expected key:value bindings to a copy of the actual data ... 
-        # ... assert it stays unchanged 
-        test_json = copy.deepcopy(actual)
-        test_json.update(expected)
-        assert actual == test_json
+        # all expected key:value bindings need to be present in the actual data
+        missing = object()
+        for key, value in expected.items():
+            assert actual.get(key, missing) == value, f"unexpected value for '{key}'"
 
     def check_file_access(self, path, exp_mask):
         actual_mask = os.lstat(path).st_mode & 0o777
@@ -394,27 +455,21 @@ class MDTestEnv(HttpdTestEnv):
                                            domain, tls=tls, ciphers=ciphers)
 
     def get_server_cert(self, domain, proto=None, ciphers=None):
-        args = [
-            "openssl", "s_client", "-status",
-            "-connect", "%s:%s" % (self._httpd_addr, self.https_port),
-            "-CAfile", self.acme_ca_pemfile,
-            "-servername", domain,
-            "-showcerts"
-        ]
-        if proto is not None:
-            args.extend(["-{0}".format(proto)])
-        if ciphers is not None:
-            args.extend(["-cipher", ciphers])
-        r = self.run(args)
+        tls = self.TLS_PROTO_VERSIONS[proto] if proto is not None else None
         # noinspection PyBroadException
         try:
-            return MDCertUtil.parse_pem_cert(r.stdout)
+            return MDCertUtil.load_server_cert(self._httpd_addr, self.https_port, domain,
+                                               tls=tls, ciphers=ciphers)
         except:
             return None
 
     def verify_cert_key_lenghts(self, domain, pkeys):
-        for p in pkeys:
-            cert = self.get_server_cert(domain, proto="tls1_2", ciphers=p['ciphers'])
+        # the handshakes do not depend on each other, run them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, len(pkeys))) as executor:
+            certs = list(executor.map(
+                lambda p: self.get_server_cert(domain, proto="tls1_2", ciphers=p['ciphers']),
+                pkeys))
+        for p, cert in zip(pkeys, certs):
             if 0 == p['keylen']:
                 assert cert is None
             else:
@@ -457,24 +512,132 @@ class MDTestEnv(HttpdTestEnv):
     def get_md_status(self, domain, via_domain=None, use_https=True) -> Dict:
         if via_domain is None:
             via_domain = self._default_domain
-        return self.get_json_content(via_domain, f"/md-status/{domain}",
+        return self._get_status_json(via_domain, f"/md-status/{domain}",
                                      use_https=use_https)
 
+    def get_all_md_status(self, via_domain=None, use_https=True) -> Dict:
+        """Get the status of all MDs with a single request, keyed by the MD
+           name and by each of its domains, as /md-status/<name> looks up."""
+        if via_domain is None:
+            via_domain = self._default_domain
+        status = self._get_status_json(via_domain, "/md-status/", use_https=use_https)
+        mds = {}
+        for md in status.get('managed-domains', []) if status else []:
+            for domain in md['domains']:
+                mds.setdefault(domain, md)
+            mds[md['name']] = md
+        return mds
+
+    def _md_status_of(self, status, name, via_domain=None, use_https=True):
+        """Look up a name in the result of get_all_md_status(). Names it
+           does not index, matching a wildcard domain or differing in case,
+           are asked from the server, which resolves them for /md-status/<name>."""
+        md = status.get(name)
+        if md is None:
+            md = self.get_md_status(name, via_domain=via_domain, use_https=use_https)
+        return md
+
+    def _get_status_json(self, via_domain, path, use_https=True, timeout=10):
+        """GET a JSON status resource over a kept-alive connection. The
+           await helpers poll these often, a curl run for each is a new
+           process and TLS handshake. Falls back to curl on failures,
+           for its error reporting."""
+        key = (via_domain, use_https)
+        port = self.https_port if use_https else self.http_port
+        for _ in range(2):
+            conn = self._status_conns.get(key)
+            if conn is None:
+                if use_https:
+                    ctx = ssl.create_default_context(cafile=self.get_ca_pem_file(via_domain))
+                    conn = _ResolvedHTTPSConnection(via_domain, port, self._httpd_addr, ctx,
+                                                    timeout=timeout)
+                else:
+                    conn = http.client.HTTPConnection(self._httpd_addr, port, timeout=timeout)
+                self._status_conns[key] = conn
+            try:
+                conn.request('GET', path, headers={'Host': f"{via_domain}:{port}"})
+                body = conn.getresponse().read()
+            except (socket.timeout, OSError, http.client.HTTPException) as e:
+                # the server may have closed the kept-alive connection or stalled
+                log.debug(f"status connection to {via_domain}: {e}")
+                conn.close()
+                del self._status_conns[key]
+                continue
+            try:
+                return json_loads(body)
+            except ValueError:
+                return None
+        return self.get_json_content(via_domain, path, use_https=use_https)
+
+    def _close_status_conns(self):
+        for conn in self._status_conns.values():
+            conn.close()
+        self._status_conns.clear()
+
+    def _run_apachectl(self, cmd) -> ExecResult:
+        # do not keep talking to server processes that are going away
+        self._close_status_conns()
+        return super()._run_apachectl(cmd)
+
     def get_server_status(self, query="/", via_domain=None, use_https=True):
         if via_domain is None:
             via_domain = self._default_domain
         return self.get_content(via_domain, "/server-status%s" % query, use_https=use_https)
 
+    def apache_pid(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.server_dir, 'logs/httpd.pid')) as fd:
+                return int(fd.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def get_config_generation(self) -> Optional[int]:
+        r = self.curl_get(f"http://{self._default_domain}:{self.http_port}/server-status?auto")
+        if r.exit_code == 0:
+            m = self.RE_CONFIG_GENERATION.search(r.stdout)
+            if m:
+                return int(m.group(1))
+        return None
+
+    def apache_signal_graceful(self, timeout=10):
+        """Apply a changed config with a graceful restart, signalled to the
+           parent process directly, and wait for the server to run with it.
+           Falls back to a full restart when apache is not running. The
+           config is not checked beforehand, a broken one makes the server
+           exit."""
+        pid = self.apache_pid()
+        generation = self.get_config_generation()
+        if pid is None or generation is None:
+            return self.apache_restart()
+        self._close_status_conns()
+        try:
+            os.kill(pid, signal.SIGUSR1)
+        except ProcessLookupError:
+            return self.apache_restart()
+        return self._await_reload(pid, generation, timeout=timeout)
+
+    def _await_reload(self, pid, generation, timeout):
+        def _reloaded():
+            g = self.get_config_generation()
+            return True if g is not None and g > generation else None
+
+        if not self._poll_until(_reloaded, timeout=timeout):
+            return -1
+        # a graceful restart keeps the parent process
+        return 0 if self.apache_pid() == pid else -1
+
     def await_completion(self, names, must_renew=False, restart=True, timeout=60,
                          via_domain=None, use_https=True):
-        try_until = time.time() + timeout
         renewals = {}
-        names = names.copy()
-        while len(names) > 0:
-            if time.time() >= try_until:
-                return False
-            for name in names:
-                mds = self.get_md_status(name, via_domain=via_domain, use_https=use_https)
+        pending = names.copy()
+
+        def _all_completed():
+            nonlocal pending
+            status = self.get_all_md_status(via_domain=via_domain, use_https=use_https)
+            still_pending = []
+            for name in pending:
+                mds = self._md_status_of(status, name, via_domain=via_domain,
+                                         use_https=use_https)
                 if mds is None:
                     log.debug("not managed by md: %s" % name)
                     return False
@@ -485,10 +648,13 @@ class MDTestEnv(HttpdTestEnv):
                     if 'finished' in renewal and renewal['finished'] is True:
                         if (not must_renew) or (name in renewals):
                             log.debug(f"domain cert was renewed: {name}")
-                            names.remove(name)
+                            continue
+                still_pending.append(name)
+            pending = still_pending
+            return True if len(pending) == 0 else None
 
-            if len(names) != 0:
-                time.sleep(0.1)
+        if len(pending) > 0 and not self._poll_until(_all_completed, timeout=timeout):
+            return False
         if restart:
             time.sleep(0.1)
             return self.apache_restart() == 0
@@ -499,50 +665,99 @@ class MDTestEnv(HttpdTestEnv):
         return 'renewal' in stat
 
     def await_renewal(self, names, timeout=60):
-        try_until = time.time() + timeout
-        while len(names) > 0:
-            if time.time() >= try_until:
-                return False
-            for name in names:
-                md = self.get_md_status(name)
+        pending = names.copy()
+
+        def _all_renewing():
+            nonlocal pending
+            status = self.get_all_md_status()
+            still_pending = []
+            for name in pending:
+                md = self._md_status_of(status, name)
                 if md is None:
                     log.debug("not managed by md: %s" % name)
                     return False
 
-                if 'renewal' in md:
-                    names.remove(name)
+                if 'renewal' not in md:
+                    still_pending.append(name)
+            pending = still_pending
+            return True if len(pending) == 0 else None
 
-            if len(names) != 0:
-                time.sleep(0.1)
-        return True
+        return len(pending) == 0 or bool(self._poll_until(_all_renewing, timeout=timeout))
 
-    def await_error(self, domain, timeout=60, via_domain=None, use_https=True, errors=1):
-        try_until = time.time() + timeout
-        while True:
-            if time.time() >= try_until:
+    @staticmethod
+    def _md_has_error(md, errors=1, problem=None) -> bool:
+        if problem is not None:
+            # skip errors still reported from an earlier config
+            last = md.get('renewal', {}).get('last', {})
+            if last.get('problem') != problem:
                 return False
+        if 'state' in md and md['state'] == MDTestEnv.MD_S_ERROR:
+            return True
+        return 'renewal' in md and 'errors' in md['renewal'] \
+            and md['renewal']['errors'] >= errors
+
+    def await_error(self, domain, timeout=60, via_domain=None, use_https=True, errors=1,
+                    problem=None):
+        # errors are recorded in the job file, ask the server again only when
+        # it changed, or after a while for state changes and non-MD names
+        job_path = self.path_job(domain)
+        job_mtime = -1
+        fetched = 0
+
+        def _has_error():
+            nonlocal job_mtime, fetched
+            try:
+                mtime = os.stat(job_path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == job_mtime and time.time() - fetched < 1.0:
+                return None
+            job_mtime, fetched = mtime, time.time()
             md = self.get_md_status(domain, via_domain=via_domain, use_https=use_https)
-            if md:
-                if 'state' in md and md['state'] == MDTestEnv.MD_S_ERROR:
-                    return md
-                if 'renewal' in md and 'errors' in md['renewal'] \
-                        and md['renewal']['errors'] >= errors:
-                    return md
-            time.sleep(0.1)
+            return md if md and self._md_has_error(md, errors=errors, problem=problem) else None
+
+        md = self._poll_until(_has_error, timeout=timeout)
+        return md if md is not None else False
+
+    def await_many(self, outcomes: Dict[str, str], timeout=60, via_domain=None, use_https=True):
+        """Wait for several MDs at once, each to reach its outcome of
+           'completion' or 'error'. Every round fetches the status of
+           all MDs with a single request.
+           :return: the md status of each domain or False on timeout
+           """
+        results = {}
+
+        def _all_reached():
+            status = self.get_all_md_status(via_domain=via_domain, use_https=use_https)
+            for domain, outcome in outcomes.items():
+                if domain in results:
+                    continue
+                md = self._md_status_of(status, domain, via_domain=via_domain,
+                                        use_https=use_https)
+                if md is None:
+                    continue
+                if outcome == 'completion':
+                    if md.get('renewal', {}).get('finished') is True:
+                        results[domain] = md
+                elif outcome == 'error':
+                    if self._md_has_error(md):
+                        results[domain] = md
+                else:
+                    raise ValueError(f"unknown outcome '{outcome}' for {domain}")
+            return True if len(results) == len(outcomes) else None
+
+        if not self._poll_until(_all_reached, timeout=timeout):
+            return False
+        return results
 
     def await_file(self, fpath, timeout=60):
-        try_until = time.time() + timeout
-        while True:
-            if time.time() >= try_until:
-                return False
-            if os.path.isfile(fpath):
-                return True
-            time.sleep(0.1)
+        return self._poll_until(lambda: True if os.path.isfile(fpath) else None,
+                                timeout=timeout) is not None
 
     def check_file_permissions(self, domain):
         dpath = os.path.join(self.store_dir, 'domains', domain)
         assert os.path.isdir(dpath)
-        md = json.load(open(os.path.join(dpath, 'md.json')))
+        md = self.load_json_file(os.path.join(dpath, 'md.json'))
         assert md
         acct = md['ca']['account']
         assert acct
@@ -570,41 +785,38 @@ class MDTestEnv(HttpdTestEnv):
             "-connect", "%s:%s" % (self._httpd_addr, self.https_port),
             "-CAfile", ca_file if ca_file else self.acme_ca_pemfile,
             "-servername", domain,
-            "-showcerts"
         ]
         if proto is not None:
             args.extend(["-{0}".format(proto)])
         if cipher is not None:
             args.extend(["-cipher", cipher])
         r = self.run(args, debug_log=False)
-        ocsp_regex = re.compile(r'OCSP response: +([^=\n]+)\n')
-        matches = ocsp_regex.finditer(r.stdout)
-        for m in matches:
-            if m.group(1) != "":
-                stat['ocsp'] = m.group(1)
-        if 'ocsp' not in stat:
-            ocsp_regex = re.compile(r'OCSP Response Status:\s*(.+)')
-            matches = ocsp_regex.finditer(r.stdout)
-            for m in matches:
-                if m.group(1) != "":
-                    stat['ocsp'] = m.group(1)
-        verify_regex = re.compile(r'Verify return code:\s*(.+)')
-        matches = verify_regex.finditer(r.stdout)
-        for m in matches:
-            if m.group(1) != "":
-                stat['verify'] = m.group(1)
+        # scan the output once, the 'OCSP response:' line wins over
+        # a 'OCSP Response Status:' found in the response details
+        found = {}
+        for m in self.RE_S_CLIENT_STATUS.finditer(r.stdout):
+            for key, value in m.groupdict().items():
+                if value:
+                    found[key] = value
+        if 'response' in found:
+            stat['ocsp'] = found['response']
+        elif 'status' in found:
+            stat['ocsp'] = found['status']
+        if 'verify' in found:
+            stat['verify'] = found['verify']
         return stat
 
     def await_ocsp_status(self, domain, timeout=10, ca_file=None):
-        try_until = time.time() + timeout
-        while True:
-            if time.time() >= try_until:
-                break
+        def _has_response():
             stat = self.get_ocsp_status(domain, ca_file=ca_file)
             if 'ocsp' in stat and stat['ocsp'] != "no response sent":
                 return stat
-            time.sleep(0.1)
-        raise TimeoutError(f"ocsp respopnse not available: {domain}")
+            return None
+
+        stat = self._poll_until(_has_response, timeout=timeout)
+        if stat is None:
+            raise TimeoutError(f"ocsp respopnse not available: {domain}")
+        return stat
 
     def create_self_signed_cert(self, name_list, valid_days, serial=1000, path=None):
         dirpath = path
@@ -252,3 +252,31 @@ class TestWildcard:
         assert r.response['body'] == content
         assert env.apache_restart() == 0
         env.check_md_complete(domain)
+
+    # test case: await a wildcard MD by the names it covers, which the
+    # status of all MDs does not list
+    def test_md_720_009(self, env):
+        dns01cmd = os.path.join(env.test_dir, "../modules/md/dns01.py")
+        domain = self.test_domain
+        dwild = "*." + domain
+        wwwdomain = "www." + domain
+        domains = [dwild]
+
+        conf = MDConf(env)
+        conf.add("MDCAChallenges dns-01")
+        conf.add(f"MDChallengeDns01 {dns01cmd}")
+        conf.add_md(domains)
+        conf.add_vhost(wwwdomain)
+        conf.install()
+
+        # restart, check that md is in store
+        assert env.apache_restart() == 0
+        env.check_md(domains)
+        # await drive completion, also for a name differing in case
+        assert env.await_renewal([wwwdomain])
+        mds = env.await_many({wwwdomain: 'completion', wwwdomain.upper(): 'completion'})
+        assert mds
+        assert mds[wwwdomain]['name'] == dwild
+        assert mds[wwwdomain.upper()]['name'] == dwild
+        assert env.await_completion([wwwdomain], restart=True)
+        env.check_md_complete(dwild)
@@ -1,12 +1,18 @@
 import json.encoder
 import os
 import re
+import shutil
 
 import pytest
 
 from .md_conf import MDConf
 from .md_env import MDTestEnv
 
+# the accounts configured in pebble/pebble-eab.json.template
+_EAB_KID1_HMAC = "zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W"
+_EAB_KID1 = f"MDExternalAccountBinding kid-1 {_EAB_KID1_HMAC}"
+_EAB_KID2 = "MDExternalAccountBinding kid-2 b10lLJs8l1GPIzsLP0s6pMt8O0XVGnfTaCeROxQM0BIt2XrJMDHJZBM5NuQmQJQH"
+
 
 @pytest.mark.skipif(condition=not MDTestEnv.has_acme_eab(),
                     reason="ACME test server does not support External Account Binding")
@@ -14,253 +20,216 @@ class TestEab:
 
     @pytest.fixture(autouse=True, scope='class')
     def _class_scope(self, env, acme):
+        # every test installs its own config and (re)starts apache,
+        # just make sure no earlier config keeps talking to the CA
+        env.apache_stop()
         acme.start(config='eab')
         env.check_acme()
         env.clear_store()
-        MDConf(env).install()
-        assert env.apache_restart() == 0
 
-    @pytest.fixture(autouse=True, scope='function')
-    def _method_scope(self, env, request):
+    @pytest.fixture()
+    def test_domain(self, env, request):
+        return env.get_request_domain(request)
+
+    @pytest.fixture()
+    def fresh_store(self, env):
+        # for tests that create accounts or certificates
         env.clear_store()
-        self.test_domain = env.get_request_domain(request)
 
-    def test_md_750_001(self, env):
-        # md without EAB configured
-        domain = self.test_domain
-        domains = [domain]
-        conf = MDConf(env)
-        conf.add_md(domains)
-        conf.add_vhost(domains=domains)
-        conf.install()
-        assert env.apache_restart() == 0
-        md = env.await_error(domain)
-        assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:externalAccountRequired'
+    @pytest.fixture(scope='class')
+    def _kid1_snapshot(self, tmp_path_factory):
+        return os.path.join(tmp_path_factory.mktemp('eab'), 'accounts')
 
-    def test_md_750_002(self, env):
-        # md with known EAB KID and non base64 hmac key configured
-        domain = self.test_domain
-        domains = [domain]
-        conf = MDConf(env)
-        conf.add("MDExternalAccountBinding kid-1 äöüß")
-        conf.add_md(domains)
-        conf.add_vhost(domains=domains)
-        conf.install()
-        assert env.apache_restart() == 0
-        md = env.await_error(domain)
-        assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'apache:eab-hmac-invalid'
+    @pytest.fixture()
+    def kid1_account(self, env, fresh_store, _kid1_snapshot, request):
+        # pebble knows the kid-1 account for as long as it runs, so the
+        # first test that registers it provides it to all later ones
+        accounts_dir = os.path.join(env.store_dir, 'accounts')
+        if os.path.isdir(_kid1_snapshot):
+            shutil.copytree(_kid1_snapshot, accounts_dir)
+        yield
+        # only a test that passed leaves a usable account behind
+        report = getattr(request.node, 'rep_call', None)
+        if report is not None and report.passed \
+                and not os.path.isdir(_kid1_snapshot) and os.path.isdir(accounts_dir) \
+                and len(env.list_accounts()) == 1:
+            shutil.copytree(accounts_dir, _kid1_snapshot)
 
-    def test_md_750_003(self, env):
+    @pytest.mark.parametrize("eab,problem", [
+        # md without EAB configured
+        pytest.param(None, 'urn:ietf:params:acme:error:externalAccountRequired',
+                     id="none"),
+        # md with known EAB KID and non base64 hmac key configured
+        pytest.param("kid-1 äöüß", 'apache:eab-hmac-invalid',
+                     id="nob64"),
         # md with empty EAB KID configured
-        domain = self.test_domain
-        domains = [domain]
-        conf = MDConf(env)
-        conf.add("MDExternalAccountBinding \" \" bm90IGEgdmFsaWQgaG1hYwo=")
-        conf.add_md(domains)
-        conf.add_vhost(domains=domains)
-        conf.install()
-        assert env.apache_restart() == 0
-        md = env.await_error(domain)
-        assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:unauthorized'
-
-    def test_md_750_004(self, env):
+        pytest.param("\" \" bm90IGEgdmFsaWQgaG1hYwo=", 'urn:ietf:params:acme:error:unauthorized',
+                     id="nokid"),
         # md with unknown EAB KID configured
-        domain = self.test_domain
-        domains = [domain]
-        conf = MDConf(env)
-        conf.add("MDExternalAccountBinding key-x bm90IGEgdmFsaWQgaG1hYwo=")
-        conf.add_md(domains)
-        conf.add_vhost(domains=domains)
-        conf.install()
-        assert env.apache_restart() == 0
-        md = env.await_error(domain)
-        assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:unauthorized'
-
-    def test_md_750_005(self, env):
+        pytest.param("key-x bm90IGEgdmFsaWQgaG1hYwo=", 'urn:ietf:params:acme:error:unauthorized',
+                     id="badkid"),
         # md with known EAB KID but wrong HMAC configured
-        domain = self.test_domain
+        pytest.param("kid-1 bm90IGEgdmFsaWQgaG1hYwo=", 'urn:ietf:params:acme:error:unauthorized',
+                     id="badhmac"),
+    ])
+    def test_md_750_001(self, env, test_domain, request, eab, problem):
+        # each case gets its own MD, named after the case id
+        domain = f"{request.node.callspec.id}-{test_domain}"
         domains = [domain]
         conf = MDConf(env)
-        conf.add("MDExternalAccountBinding kid-1 bm90IGEgdmFsaWQgaG1hYwo=")
+        if eab is not None:
+            conf.add(f"MDExternalAccountBinding {eab}")
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         md = env.await_error(domain)
         assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:unauthorized'
+        assert md['renewal']['last']['problem'] == problem
 
-    def test_md_750_010(self, env):
+    @pytest.mark.usefixtures("kid1_account")
+    def test_md_750_010(self, env, test_domain):
         # md with correct EAB configured
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         conf = MDConf(env)
-        # this is one of the values in conf/pebble-eab.json
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         assert env.await_completion(domains)
 
-    def test_md_750_011(self, env):
+    @pytest.mark.usefixtures("kid1_account")
+    def test_md_750_011(self, env, test_domain):
         # first one md with EAB, then one without, works only for the first
         # as the second is unable to reuse the account
-        domain_a = f"a{self.test_domain}"
-        domain_b = f"b{self.test_domain}"
+        domain_a = f"a{test_domain}"
+        domain_b = f"b{test_domain}"
         conf = MDConf(env)
         conf.start_md([domain_a])
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.end_md()
         conf.add_vhost(domains=[domain_a])
         conf.add_md([domain_b])
         conf.add_vhost(domains=[domain_b])
         conf.install()
-        assert env.apache_restart() == 0
-        assert env.await_completion([domain_a], restart=False)
-        md = env.await_error(domain_b)
+        assert env.apache_signal_graceful() == 0
+        mds = env.await_many({domain_a: 'completion', domain_b: 'error'})
+        assert mds
+        md = mds[domain_b]
         assert md['renewal']['errors'] > 0
         assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:externalAccountRequired'
 
-    def test_md_750_012(self, env):
+    @pytest.mark.usefixtures("kid1_account")
+    def test_md_750_012(self, env, test_domain):
         # first one md without EAB, then one with
         # first one fails, second works
-        domain_a = f"a{self.test_domain}"
-        domain_b = f"b{self.test_domain}"
+        domain_a = f"a{test_domain}"
+        domain_b = f"b{test_domain}"
         conf = MDConf(env)
         conf.add_md([domain_a])
         conf.add_vhost(domains=[domain_a])
         conf.start_md([domain_b])
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.end_md()
         conf.add_vhost(domains=[domain_b])
         conf.install()
-        assert env.apache_restart() == 0
-        assert env.await_completion([domain_b], restart=False)
-        md = env.await_error(domain_a)
+        assert env.apache_signal_graceful() == 0
+        mds = env.await_many({domain_b: 'completion', domain_a: 'error'})
+        assert mds
+        md = mds[domain_a]
         assert md['renewal']['errors'] > 0
         assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:externalAccountRequired'
 
-    def test_md_750_013(self, env):
+    @pytest.mark.usefixtures("fresh_store")
+    def test_md_750_013(self, env, test_domain):
         # 2 mds with the same EAB, should one create a single account
-        domain_a = f"a{self.test_domain}"
-        domain_b = f"b{self.test_domain}"
+        domain_a = f"a{test_domain}"
+        domain_b = f"b{test_domain}"
         conf = MDConf(env)
         conf.start_md([domain_a])
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.end_md()
         conf.add_vhost(domains=[domain_a])
         conf.start_md([domain_b])
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.end_md()
         conf.add_vhost(domains=[domain_b])
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         assert env.await_completion([domain_a, domain_b])
         md_a = env.get_md_status(domain_a)
         md_b = env.get_md_status(domain_b)
         assert md_a['ca'] == md_b['ca']
 
-    def test_md_750_014(self, env):
-        # md with correct EAB, get cert, change to another correct EAB
-        # needs to create a new account
-        domain = self.test_domain
+    @pytest.mark.usefixtures("fresh_store")
+    def test_md_750_014(self, env, test_domain):
+        # md with correct EAB, get cert, then change the EAB in stages.
+        # Each stage adds a dns name to force a renewal.
+        domain = test_domain
         domains = [domain]
         conf = MDConf(env)
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         assert env.await_completion(domains)
         md_1 = env.get_md_status(domain)
+        # change to another correct EAB, needs to create a new account
+        domains = domains + [f'www.{domain}']
         conf = MDConf(env)
-        # this is another one of the values in conf/pebble-eab.json
-        # add a dns name to force renewal
-        domains = [domain, f'www.{domain}']
-        conf.add("MDExternalAccountBinding kid-2 b10lLJs8l1GPIzsLP0s6pMt8O0XVGnfTaCeROxQM0BIt2XrJMDHJZBM5NuQmQJQH")
+        conf.add(_EAB_KID2)
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         assert env.await_completion(domains)
         md_2 = env.get_md_status(domain)
         assert md_1['ca'] != md_2['ca']
-
-    def test_md_750_015(self, env):
-        # md with correct EAB, get cert, change to no EAB
-        # needs to fail
-        domain = self.test_domain
-        domains = [domain]
+        # change to no EAB, needs to fail
+        domains = domains + [f'mail.{domain}']
         conf = MDConf(env)
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
-        assert env.await_completion(domains)
-        conf = MDConf(env)
-        # this is another one of the values in conf/pebble-eab.json
-        # add a dns name to force renewal
-        domains = [domain, f'www.{domain}']
-        conf.add_md(domains)
-        conf.add_vhost(domains=domains)
-        conf.install()
-        assert env.apache_restart() == 0
-        assert env.await_error(domain)
-        md = env.await_error(domain)
+        assert env.apache_signal_graceful() == 0
+        md = env.await_error(domain, problem='urn:ietf:params:acme:error:externalAccountRequired')
+        assert md
         assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:externalAccountRequired'
-
-    def test_md_750_016(self, env):
-        # md with correct EAB, get cert, change to invalid EAB
-        # needs to fail
-        domain = self.test_domain
-        domains = [domain]
+        # change to invalid EAB, needs to fail
+        domains = domains + [f'ftp.{domain}']
         conf = MDConf(env)
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
-        conf.add_md(domains)
-        conf.add_vhost(domains=domains)
-        conf.install()
-        assert env.apache_restart() == 0
-        assert env.await_completion(domains)
-        conf = MDConf(env)
-        # this is another one of the values in conf/pebble-eab.json
-        # add a dns name to force renewal
-        domains = [domain, f'www.{domain}']
         conf.add("MDExternalAccountBinding kid-invalud blablabalbalbla")
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
-        assert env.await_error(domain)
-        md = env.await_error(domain)
+        assert env.apache_signal_graceful() == 0
+        md = env.await_error(domain, problem='urn:ietf:params:acme:error:unauthorized')
+        assert md
         assert md['renewal']['errors'] > 0
-        assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:unauthorized'
 
-    def test_md_750_017(self, env):
+    @pytest.mark.usefixtures("fresh_store")
+    def test_md_750_017(self, env, test_domain):
         # md without EAB explicitly set to none
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         conf = MDConf(env)
-        conf.add("MDExternalAccountBinding kid-1 zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W")
+        conf.add(_EAB_KID1)
         conf.start_md(domains)
         conf.add("MDExternalAccountBinding none")
         conf.end_md()
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         md = env.await_error(domain)
         assert md['renewal']['errors'] > 0
         assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:externalAccountRequired'
 
-    def test_md_750_018(self, env):
+    def test_md_750_018(self, env, test_domain):
         # md with EAB file that does not exist
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         conf = MDConf(env)
         conf.add("MDExternalAccountBinding does-not-exist")
@@ -270,9 +239,9 @@ class TestEab:
         assert env.apache_fail() == 0
         assert re.search(r'.*file not found:', env.apachectl_stderr), env.apachectl_stderr
 
-    def test_md_750_019(self, env):
+    def test_md_750_019(self, env, test_domain):
         # md with EAB file that is not valid JSON
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         eab_file = os.path.join(env.server_dir, 'eab.json')
         with open(eab_file, 'w') as fd:
@@ -285,9 +254,9 @@ class TestEab:
         assert env.apache_fail() == 0
         assert re.search(r'.*error reading JSON file.*', env.apachectl_stderr), env.apachectl_stderr
 
-    def test_md_750_020(self, env):
+    def test_md_750_020(self, env, test_domain):
         # md with EAB file that is JSON, but missind kid
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         eab_file = os.path.join(env.server_dir, 'eab.json')
         with open(eab_file, 'w') as fd:
@@ -301,9 +270,9 @@ class TestEab:
         assert env.apache_fail() == 0
         assert re.search(r'.*JSON does not contain \'kid\' element.*', env.apachectl_stderr), env.apachectl_stderr
 
-    def test_md_750_021(self, env):
+    def test_md_750_021(self, env, test_domain):
         # md with EAB file that is JSON, but missind hmac
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         eab_file = os.path.join(env.server_dir, 'eab.json')
         with open(eab_file, 'w') as fd:
@@ -317,21 +286,21 @@ class TestEab:
         assert env.apache_fail() == 0
         assert re.search(r'.*JSON does not contain \'hmac\' element.*', env.apachectl_stderr), env.apachectl_stderr
 
-    def test_md_750_022(self, env):
+    @pytest.mark.usefixtures("kid1_account")
+    def test_md_750_022(self, env, test_domain):
         # md with EAB file that has correct values
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         eab_file = os.path.join(env.server_dir, 'eab.json')
         with open(eab_file, 'w') as fd:
-            eab = {'kid': 'kid-1', 'hmac': 'zWNDZM6eQGHWpSRTPal5eIUYFTu7EajVIoguysqZ9wG44nMEtx3MUAsUDkMTQ12W'}
+            eab = {'kid': 'kid-1', 'hmac': _EAB_KID1_HMAC}
             fd.write(json.encoder.JSONEncoder().encode(eab))
-        domain = self.test_domain
+        domain = test_domain
         domains = [domain]
         conf = MDConf(env)
-        # this is one of the values in conf/pebble-eab.json
         conf.add("MDExternalAccountBinding eab.json")
         conf.add_md(domains)
         conf.add_vhost(domains=domains)
         conf.install()
-        assert env.apache_restart() == 0
+        assert env.apache_signal_graceful() == 0
         assert env.await_completion(domains)
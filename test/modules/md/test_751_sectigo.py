@@ -84,8 +84,8 @@ class TestSectigo:
         conf.add_vhost(domains=domains)
         conf.install()
         assert env.apache_restart() == 0
-        assert env.await_error(domain)
-        md = env.get_md_status(domain)
+        md = env.await_error(domain)
+        assert md
         assert md['renewal']['errors'] > 0
         assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:externalAccountRequired'
 
@@ -102,8 +102,8 @@ class TestSectigo:
         conf.add_vhost(domains=domains)
         conf.install()
         assert env.apache_restart() == 0
-        assert env.await_error(domain)
-        md = env.get_md_status(domain)
+        md = env.await_error(domain)
+        assert md
         assert md['renewal']['errors'] > 0
         assert md['renewal']['last']['problem'] == 'urn:ietf:params:acme:error:unauthorized'
 
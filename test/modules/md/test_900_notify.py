@@ -46,8 +46,8 @@ class TestNotify:
             MDNotifyCmd {command} {args}
             """)
         assert env.apache_restart() == 0
-        assert env.await_error(self.domain)
-        stat = env.get_md_status(self.domain)
+        stat = env.await_error(self.domain)
+        assert stat
         assert stat["renewal"]["last"]["problem"] == "urn:org:apache:httpd:log:AH10108:"
 
     # test: valid notify cmd that fails, check error
@@ -58,8 +58,8 @@ class TestNotify:
             MDNotifyCmd {command} {args}
             """)
         assert env.apache_restart() == 0
-        assert env.await_error(self.domain)
-        stat = env.get_md_status(self.domain)
+        stat = env.await_error(self.domain)
+        assert stat
         assert stat["renewal"]["last"]["problem"] == "urn:org:apache:httpd:log:AH10108:"
 
     # test: valid notify that logs to file
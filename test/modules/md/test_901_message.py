@@ -59,8 +59,8 @@ class TestMessage:
         conf.add_vhost(domains)
         conf.install()
         assert env.apache_restart() == 0
-        assert env.await_error(domain)
-        stat = env.get_md_status(domain)
+        stat = env.await_error(domain)
+        assert stat
         # this command should have failed and logged an error
         assert stat["renewal"]["last"]["problem"] == "urn:org:apache:httpd:log:AH10109:"
 
@@ -1,4 +1,6 @@
+import hashlib
 import inspect
+import json
 import logging
 import re
 import os
@@ -86,11 +88,21 @@ class HttpdTestSetup:
         self.env.clear_curl_headerfiles()
 
     def _make_dirs(self):
+        # keep the certificates of a previous run out of harm's way,
+        # HttpdTestEnv.issue_certs() decides if they may be used again
+        kept_ca_dir = None
+        if os.path.isdir(self.env.ca_dir):
+            kept_ca_dir = f"{os.path.normpath(self.env.gen_dir)}.ca"
+            if os.path.exists(kept_ca_dir):
+                shutil.rmtree(kept_ca_dir)
+            os.rename(self.env.ca_dir, kept_ca_dir)
         if os.path.exists(self.env.gen_dir):
             shutil.rmtree(self.env.gen_dir)
         os.makedirs(self.env.gen_dir)
         if not os.path.exists(self.env.server_logs_dir):
             os.makedirs(self.env.server_logs_dir)
+        if kept_ca_dir:
+            os.rename(kept_ca_dir, self.env.ca_dir)
 
     def _make_conf(self):
         # remove anything from another run/test suite
@@ -104,9 +116,9 @@ class HttpdTestSetup:
                     os.makedirs(conf_dest_dir)
                 for name in os.listdir(conf_src_dir):
                     src_path = os.path.join(conf_src_dir, name)
-                    m = re.match(r'(.+).template', name)
-                    if m:
-                        self._make_template(src_path, os.path.join(conf_dest_dir, m.group(1)))
+                    if name.endswith('.template'):
+                        self._make_template(src_path, os.path.join(
+                            conf_dest_dir, name[:-len('.template')]))
                     elif os.path.isfile(src_path):
                         shutil.copy(src_path, os.path.join(conf_dest_dir, name))
 
@@ -115,7 +127,8 @@ class HttpdTestSetup:
         for name, value in HttpdTestEnv.__dict__.items():
             if isinstance(value, property):
                 var_map[name] = value.fget(self.env)
-        t = Template(''.join(open(src).readlines()))
+        with open(src) as fd:
+            t = Template(fd.read())
         with open(dest, 'w') as fd:
             fd.write(t.substitute(var_map))
 
@@ -165,6 +178,11 @@ class HttpdTestSetup:
 
 class HttpdTestEnv:
 
+    # how long certificates issued in a previous run may be used again
+    CA_REUSE_MAX_AGE = timedelta(days=1)
+
+    _apxs_vars = {}
+
     @classmethod
     def get_ssl_module(cls):
         return os.environ['SSL'] if 'SSL' in os.environ else 'mod_ssl'
@@ -195,6 +213,7 @@ class HttpdTestEnv:
         self._test_dir = self.config.get('test', 'test_dir')
         self._gen_dir = self.config.get('test', 'gen_dir')
         self._server_dir = os.path.join(self._gen_dir, 'apache')
+        self._ca_dir = os.path.join(self._server_dir, 'ca')
         self._server_conf_dir = os.path.join(self._server_dir, "conf")
         self._server_docs_dir = os.path.join(self._server_dir, "htdocs")
         self._server_logs_dir = os.path.join(self.server_dir, "logs")
@@ -218,6 +237,7 @@ class HttpdTestEnv:
         self._httpd_base_conf = []
         self._httpd_log_modules = []
         self._log_interesting = None
+        self._test_conf_head = None
         self._setup = None
 
         self._ca = None
@@ -233,16 +253,57 @@ class HttpdTestEnv:
 
     def add_httpd_conf(self, lines: List[str]):
         self._httpd_base_conf.extend(lines)
+        self._test_conf_head = None
 
     def add_httpd_log_modules(self, modules: List[str]):
         self._httpd_log_modules.extend(modules)
 
+    def _cert_specs_digest(self) -> str:
+        def _to_json(obj):
+            return obj.__dict__ if isinstance(obj, CertificateSpec) else str(obj)
+        specs = json.dumps(self._cert_specs, default=_to_json, sort_keys=True)
+        return hashlib.sha256(f"{self.http_tld}\n{specs}".encode()).hexdigest()
+
+    def _check_ca_store(self) -> float:
+        """Remove the CA store of a previous run, unless it was made for the
+           same certificate specs not too long ago. Key generation for the
+           CA and all certificates takes quite some time. The stamp of a
+           reused store is removed until its certificates are issued.
+           :return: the creation time of the store
+           """
+        stamp = os.path.join(self._ca_dir, 'specs.sha256')
+        if os.path.isfile(stamp):
+            with open(stamp) as fd:
+                same_specs = fd.read().strip() == self._cert_specs_digest()
+            created = os.path.getmtime(stamp)
+            age = timedelta(seconds=time.time() - created)
+            if same_specs and age < self.CA_REUSE_MAX_AGE:
+                log.debug(f"reusing certificates in {self._ca_dir}")
+                os.remove(stamp)
+                return created
+        if os.path.exists(self._ca_dir):
+            shutil.rmtree(self._ca_dir)
+        os.makedirs(self._ca_dir)
+        return time.time()
+
+    def _stamp_ca_store(self, digest: str, created: float):
+        stamp = os.path.join(self._ca_dir, 'specs.sha256')
+        with open(stamp, 'w') as fd:
+            fd.write(digest)
+        os.utime(stamp, (created, created))
+
     def issue_certs(self):
         if self._ca is None:
+            # only a store whose certificates were all written gets a stamp
+            digest = self._cert_specs_digest()
+            created = self._check_ca_store()
             self._ca = HttpdTestCA.create_root(name=self.http_tld,
-                                               store_dir=os.path.join(self.server_dir, 'ca'),
+                                               store_dir=self._ca_dir,
                                                key_type="rsa4096")
-        self._ca.issue_certs(self._cert_specs)
+            self._ca.issue_certs(self._cert_specs)
+            self._stamp_ca_store(digest, created)
+        else:
+            self._ca.issue_certs(self._cert_specs)
 
     def setup_httpd(self, setup: HttpdTestSetup = None):
         """Create the server environment with config, htdocs and certificates"""
@@ -259,6 +320,7 @@ class HttpdTestEnv:
             self._log_interesting = "LogLevel"
             for name in self._httpd_log_modules:
                 self._log_interesting += f" {name}:{log_level}"
+        self._test_conf_head = None
 
     @property
     def apxs(self) -> str:
@@ -324,6 +386,10 @@ class HttpdTestEnv:
     def server_dir(self) -> str:
         return self._server_dir
 
+    @property
+    def ca_dir(self) -> str:
+        return self._ca_dir
+
     @property
     def server_logs_dir(self) -> str:
         return self._server_logs_dir
@@ -413,10 +479,12 @@ class HttpdTestEnv:
         return p.stderr == ""
 
     def get_apxs_var(self, name: str) -> str:
-        p = subprocess.run([self._apxs, "-q", name], capture_output=True, text=True)
-        if p.returncode != 0:
-            return ""
-        return p.stdout.strip()
+        # the answers do not change while we run, ask apxs only once
+        key = (self._apxs, name)
+        if key not in HttpdTestEnv._apxs_vars:
+            p = subprocess.run([self._apxs, "-q", name], capture_output=True, text=True)
+            HttpdTestEnv._apxs_vars[key] = p.stdout.strip() if p.returncode == 0 else ""
+        return HttpdTestEnv._apxs_vars[key]
 
     def get_httpd_version(self) -> str:
         return self.get_apxs_var("HTTPD_VERSION")
@@ -435,44 +503,66 @@ class HttpdTestEnv:
                           stdout=p.stdout, stderr=p.stderr,
                           duration=datetime.now() - start)
 
+    def _poll_until(self, check, timeout: float, interval=0.05, factor=1.6, max_interval=1.0):
+        """Call check() until it returns something other than None or
+           timeout seconds have passed. The pause between calls starts at
+           interval and grows by factor up to max_interval.
+           :return: the result of check() or None on timeout
+           """
+        try_until = time.time() + timeout
+        while True:
+            rv = check()
+            if rv is not None:
+                return rv
+            remaining = try_until - time.time()
+            if remaining <= 0:
+                return None
+            time.sleep(min(interval, remaining))
+            interval = min(interval * factor, max_interval)
+
     def mkurl(self, scheme, hostname, path='/'):
         port = self.https_port if scheme == 'https' else self.http_port
         return f"{scheme}://{hostname}.{self.http_tld}:{port}{path}"
 
-    def install_test_conf(self, lines: List[str]):
-        with open(self._test_conf, 'w') as fd:
-            fd.write('\n'.join(self._httpd_base_conf))
-            fd.write('\n')
+    def _get_test_conf_head(self) -> str:
+        # the same for every test config, until the base config changes
+        if self._test_conf_head is None:
+            head = '\n'.join(self._httpd_base_conf) + '\n'
             if self._verbosity >= 2:
-                fd.write(f"LogLevel core:trace5 {self.mpm_module}:trace5\n")
+                head += f"LogLevel core:trace5 {self.mpm_module}:trace5\n"
             if self._log_interesting:
-                fd.write(self._log_interesting)
-            fd.write('\n\n')
-            fd.write('\n'.join(lines))
-            fd.write('\n')
+                head += self._log_interesting
+            self._test_conf_head = head + '\n\n'
+        return self._test_conf_head
+
+    def install_test_conf(self, lines: List[str]):
+        with open(self._test_conf, 'w') as fd:
+            fd.write(self._get_test_conf_head() + '\n'.join(lines) + '\n')
 
     def is_live(self, url: str = None, timeout: timedelta = None):
         if url is None:
             url = self._http_base
         if timeout is None:
             timeout = timedelta(seconds=5)
-        try_until = datetime.now() + timeout
         last_err = ""
-        while datetime.now() < try_until:
+
+        def _live():
+            nonlocal last_err
             # noinspection PyBroadException
             try:
                 r = self.curl_get(url, insecure=True)
                 if r.exit_code == 0:
                     return True
-                time.sleep(.1)
             except ConnectionRefusedError:
                 log.debug("connection refused")
-                time.sleep(.1)
             except:
                 if last_err != str(sys.exc_info()[0]):
                     last_err = str(sys.exc_info()[0])
                     log.debug("Unexpected error: %s", last_err)
-                time.sleep(.1)
+            return None
+
+        if self._poll_until(_live, timeout=timeout.total_seconds()):
+            return True
         log.debug(f"Unable to contact server after {timeout}")
         return False
 
@@ -481,15 +571,15 @@ class HttpdTestEnv:
             url = self._http_base
         if timeout is None:
             timeout = timedelta(seconds=5)
-        try_until = datetime.now() + timeout
         last_err = None
-        while datetime.now() < try_until:
+
+        def _dead():
+            nonlocal last_err
             # noinspection PyBroadException
             try:
                 r = self.curl_get(url)
                 if r.exit_code != 0:
                     return True
-                time.sleep(.1)
             except ConnectionRefusedError:
                 log.debug("connection refused")
                 return True
@@ -497,7 +587,10 @@ class HttpdTestEnv:
                 if last_err != str(sys.exc_info()[0]):
                     last_err = str(sys.exc_info()[0])
                     log.debug("Unexpected error: %s", last_err)
-                time.sleep(.1)
+            return None
+
+        if self._poll_until(_dead, timeout=timeout.total_seconds()):
+            return True
         log.debug(f"Server still responding after {timeout}")
         return False
 
@@ -601,7 +694,8 @@ class HttpdTestEnv:
         return args, headerfile
 
     def curl_parse_headerfile(self, headerfile: str, r: ExecResult = None) -> ExecResult:
-        lines = open(headerfile).readlines()
+        with open(headerfile) as fd:
+            lines = fd.readlines()
         exp_stat = True
         if r is None:
             r = ExecResult(args=[], exit_code=0, stdout=b'', stderr=b'')
@@ -3,7 +3,7 @@ import re
 import time
 from datetime import datetime, timedelta
 from io import SEEK_END
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Optional
 
 
 class HttpdErrorLog:
@@ -11,8 +11,8 @@ class HttpdErrorLog:
        limiting checks from a last known position forward.
     """
 
-    RE_ERRLOG_ERROR = re.compile(r'.*\[(?P<module>[^:]+):error].*')
-    RE_ERRLOG_WARN = re.compile(r'.*\[(?P<module>[^:]+):warn].*')
+    # the [module:level] tag follows the timestamp, the first field of a line
+    RE_ERRLOG_LEVEL = re.compile(r'(?:\[[^\]]*]\s*)?\[(?P<module>[^:\]]+):(?P<level>error|warn)]')
     RE_APLOGNO = re.compile(r'.*\[(?P<module>[^:]+):(error|warn)].* (?P<aplogno>AH\d+): .+')
     RE_SSL_LIB_ERR = re.compile(r'.*\[ssl:error].* SSL Library Error: error:(?P<errno>\S+):.+')
 
@@ -70,6 +70,19 @@ class HttpdErrorLog:
             return True
         return False
 
+    def _get_level(self, line: str) -> Optional[str]:
+        """Return 'error' or 'warn' if the line is one we need to report."""
+        # most lines are neither, a substring test is much cheaper than
+        # running the level and all ignore patterns on them
+        if ':error]' not in line and ':warn]' not in line:
+            return None
+        m = self.RE_ERRLOG_LEVEL.match(line)
+        if not m or m.group('module') in self._ignored_modules:
+            return None
+        if self._is_ignored(line):
+            return None
+        return m.group('level')
+
     def get_recent(self, advance=True) -> Tuple[List[str], List[str]]:
         """Collect error and warning from the log since the last remembered position
         :param advance: advance the position to the end of the log afterwards
@@ -81,17 +94,11 @@ class HttpdErrorLog:
             with open(self._path) as fd:
                 fd.seek(self._last_pos, os.SEEK_SET)
                 for line in fd:
-                    if self._is_ignored(line):
-                        continue
-                    m = self.RE_ERRLOG_ERROR.match(line)
-                    if m and m.group('module') not in self._ignored_modules:
+                    level = self._get_level(line)
+                    if level == 'error':
                         self._last_errors.append(line)
-                        continue
-                    m = self.RE_ERRLOG_WARN.match(line)
-                    if m:
-                        if m and m.group('module') not in self._ignored_modules:
-                            self._last_warnings.append(line)
-                            continue
+                    elif level == 'warn':
+                        self._last_warnings.append(line)
                 if advance:
                     self._last_pos = fd.tell()
             self._observed_erros.update(set(self._last_errors))
@@ -112,17 +119,11 @@ class HttpdErrorLog:
             with open(self._path) as fd:
                 fd.seek(self._last_pos, os.SEEK_SET)
                 for line in fd:
-                    if self._is_ignored(line):
-                        continue
-                    m = self.RE_ERRLOG_ERROR.match(line)
-                    if m and m.group('module') not in self._ignored_modules:
+                    level = self._get_level(line)
+                    if level == 'error':
                         self._observed_erros.add(line)
-                        continue
-                    m = self.RE_ERRLOG_WARN.match(line)
-                    if m:
-                        if m and m.group('module') not in self._ignored_modules:
-                            self._observed_warnings.add(line)
-                            continue
+                    elif level == 'warn':
+                        self._observed_warnings.add(line)
                 self._last_pos = fd.tell()
 
     def get_missed(self) -> Tuple[List[str], List[str]]:
@@ -132,19 +133,13 @@ class HttpdErrorLog:
             with open(self._path) as fd:
                 fd.seek(self._start_pos, os.SEEK_SET)
                 for line in fd:
-                    if self._is_ignored(line):
-                        continue
-                    m = self.RE_ERRLOG_ERROR.match(line)
-                    if m and m.group('module') not in self._ignored_modules \
-                            and line not in self._observed_erros:
-                        errors.append(line)
-                        continue
-                    m = self.RE_ERRLOG_WARN.match(line)
-                    if m:
-                        if m and m.group('module') not in self._ignored_modules \
-                                and line not in self._observed_warnings:
+                    level = self._get_level(line)
+                    if level == 'error':
+                        if line not in self._observed_erros:
+                            errors.append(line)
+                    elif level == 'warn':
+                        if line not in self._observed_warnings:
                             warnings.append(line)
-                            continue
         return errors, warnings
 
     def scan_recent(self, pattern: re, timeout=10):
@@ -152,11 +147,18 @@ class HttpdErrorLog:
             return False
         with open(self.path) as fd:
             end = datetime.now() + timedelta(seconds=timeout)
+            pos = self._last_pos
             while True:
-                fd.seek(self._last_pos, os.SEEK_SET)
-                for line in fd:
+                # only look at lines added since the previous round
+                fd.seek(pos, os.SEEK_SET)
+                while True:
+                    line = fd.readline()
+                    if not line.endswith('\n'):
+                        # nothing new or line not completely written yet
+                        break
                     if pattern.match(line):
                         return True
+                    pos = fd.tell()
                 if datetime.now() > end:
                     raise TimeoutError(f"pattern not found in error log after {timeout} seconds")
                 time.sleep(.1)
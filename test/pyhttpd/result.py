@@ -2,6 +2,13 @@ import json
 from datetime import timedelta
 from typing import Optional, Dict, List
 
+try:
+    # faster, if installed, the status JSON is parsed a lot while polling
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 
 class ExecResult:
 
@@ -18,7 +25,7 @@ class ExecResult:
         self._assets = []
         # noinspection PyBroadException
         try:
-            self._json_out = json.loads(self._stdout)
+            self._json_out = json_loads(self._raw)
         except:
             self._json_out = None
 